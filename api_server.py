@@ -1,18 +1,16 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
-import logging
 import os
 from typing import Dict, Optional
 from video_processor import VideoProcessor
+from model_runner import get_shared_runner
+from logging_config import get_logger
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("API-Server")
+logger = get_logger("API-Server")
 
 # 创建FastAPI应用
 app = FastAPI(title="YOLO视频流处理API")
@@ -26,8 +24,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 全局视频处理器实例
-video_processor = None
+# 按流ID管理的视频处理器实例，使用同一权重的各路流共享模型并批量推理
+video_processors: Dict[str, VideoProcessor] = {}
 
 # 请求模型
 class ProcessorConfig(BaseModel):
@@ -38,6 +36,8 @@ class ProcessorConfig(BaseModel):
     width: Optional[int] = 1280
     height: Optional[int] = 720
     bitrate: Optional[str] = "2000k"
+    use_gpu: Optional[bool] = None
+    stream_id: Optional[str] = "default"
 
 @app.get("/")
 async def root():
@@ -50,57 +50,65 @@ async def root():
 
 @app.post("/start")
 async def start_processing(config: ProcessorConfig):
-    """启动视频处理"""
-    global video_processor
-    
+    """启动视频处理（同一流ID已有处理器时先停止它）"""
     try:
         # 检查模型文件是否存在
         if not os.path.exists(config.model_weights_path):
             raise HTTPException(status_code=400, detail=f"模型文件不存在: {config.model_weights_path}")
         
-        # 如果已有处理器在运行，先停止它
-        if video_processor is not None:
-            video_processor.stop()
+        # 如果该流已有处理器在运行，先停止它
+        # 处理器的创建、启动和停止涉及模型加载和线程等待，放到线程池中执行以免阻塞事件循环
+        old_processor = video_processors.pop(config.stream_id, None)
+        if old_processor is not None:
+            await run_in_threadpool(old_processor.stop)
+        
+        # 获取该权重的共享推理器，各路流的帧合并为批次推理，重启处理时也无需重新加载模型
+        model_runner = await run_in_threadpool(get_shared_runner, config.model_weights_path)
         
         # 创建新的处理器
-        video_processor = VideoProcessor(
+        video_processor = await run_in_threadpool(
+            VideoProcessor,
             input_rtmp_url=config.input_rtmp_url,
             output_rtmp_url=config.output_rtmp_url,
             model_weights_path=config.model_weights_path,
             fps=config.fps,
             width=config.width,
             height=config.height,
-            bitrate=config.bitrate
+            bitrate=config.bitrate,
+            use_gpu=config.use_gpu,
+            model_runner=model_runner
         )
         
         # 启动处理
-        video_processor.start()
+        await run_in_threadpool(video_processor.start)
+        video_processors[config.stream_id] = video_processor
         
-        return {"status": "success", "message": "视频处理已启动"}
+        return {"status": "success", "message": "视频处理已启动", "stream_id": config.stream_id}
     except Exception as e:
-        logger.error(f"启动视频处理时出错: {str(e)}")
+        logger.error("启动视频处理时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"启动视频处理失败: {str(e)}")
 
 @app.post("/stop")
-async def stop_processing():
-    """停止视频处理"""
-    global video_processor
+async def stop_processing(stream_id: Optional[str] = None):
+    """停止指定流的视频处理，未指定流ID时停止所有流"""
+    stream_ids = list(video_processors) if stream_id is None else [stream_id]
+    stream_ids = [sid for sid in stream_ids if sid in video_processors]
     
-    if video_processor is None:
+    if not stream_ids:
         return {"status": "warning", "message": "没有正在运行的视频处理器"}
     
     try:
-        video_processor.stop()
-        video_processor = None
-        return {"status": "success", "message": "视频处理已停止"}
+        for sid in stream_ids:
+            await run_in_threadpool(video_processors.pop(sid).stop)
+        return {"status": "success", "message": "视频处理已停止", "stream_ids": stream_ids}
     except Exception as e:
-        logger.error(f"停止视频处理时出错: {str(e)}")
+        logger.error("停止视频处理时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"停止视频处理失败: {str(e)}")
 
 @app.get("/status")
-async def get_status():
-    """获取处理状态和性能指标"""
-    global video_processor
+async def get_status(stream_id: str = "default"):
+    """获取指定流的处理状态和性能指标"""
+    video_processor = video_processors.get(stream_id)
     
     if video_processor is None:
         return {
@@ -117,15 +125,24 @@ async def get_status():
             "metrics": metrics
         }
     except Exception as e:
-        logger.error(f"获取状态时出错: {str(e)}")
+        logger.error("获取状态时出错: %s", e)
         raise HTTPException(status_code=500, detail=f"获取状态失败: {str(e)}")
 
 # 主入口
 if __name__ == "__main__":
+    # 优先使用uvloop事件循环和httptools解析器（Windows不支持uvloop，回退到asyncio）
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    
     # 启动Uvicorn服务器
     uvicorn.run(
         "api_server:app",
         host="0.0.0.0",
         port=8000,
+        loop=loop,
+        http="httptools",
         reload=False
     ) 
\ No newline at end of file
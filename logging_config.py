@@ -0,0 +1,22 @@
+import logging
+
+# 全局日志格式
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 配置日志（模块只会被导入一次，因此只配置一次）
+logging.basicConfig(
+    level=logging.INFO,
+    format=LOG_FORMAT
+)
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取使用全局日志配置的日志器
+    
+    参数:
+        name: 日志器名称
+        
+    返回:
+        日志器对象
+    """
+    return logging.getLogger(name)
@@ -1,22 +1,25 @@
 import os
 import argparse
-import logging
 import subprocess
 import time
 import signal
 import sys
+import threading
 from typing import List, Optional
+from logging_config import get_logger
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("YOLO-Main")
+logger = get_logger("YOLO-Main")
 
 # 全局进程列表
 processes = []
 
+# 子进程退出事件，由监视线程在进程退出时设置
+process_exited = threading.Event()
+
+# 正在主动停止所有进程，此时进程退出属于预期行为
+stopping = threading.Event()
+
 def start_nginx(config_path: str) -> Optional[subprocess.Popen]:
     """
     启动Nginx RTMP服务器
@@ -28,16 +31,16 @@ def start_nginx(config_path: str) -> Optional[subprocess.Popen]:
         Nginx进程对象或None（如果启动失败）
     """
     try:
-        logger.info(f"使用配置文件启动Nginx: {config_path}")
+        logger.info("使用配置文件启动Nginx: %s", config_path)
         
         # 检查配置文件是否存在
         if not os.path.exists(config_path):
-            logger.error(f"Nginx配置文件不存在: {config_path}")
+            logger.error("Nginx配置文件不存在: %s", config_path)
             return None
         
         # 获取配置文件的绝对路径
         abs_config_path = os.path.abspath(config_path)
-        logger.info(f"Nginx配置文件绝对路径: {abs_config_path}")
+        logger.info("Nginx配置文件绝对路径: %s", abs_config_path)
         
         # 启动Nginx，使用-c参数指定配置文件的绝对路径
         process = subprocess.Popen(
@@ -53,13 +56,13 @@ def start_nginx(config_path: str) -> Optional[subprocess.Popen]:
         if process.poll() is not None:
             _, stderr = process.communicate()
             stderr_text = stderr.decode('utf-8') if stderr else "未知错误"
-            logger.error(f"Nginx启动失败: {stderr_text}")
+            logger.error("Nginx启动失败: %s", stderr_text)
             return None
         
         logger.info("Nginx RTMP服务器已启动")
         return process
     except Exception as e:
-        logger.error(f"启动Nginx时出错: {str(e)}")
+        logger.error("启动Nginx时出错: %s", e)
         return None
 
 def start_api_server() -> Optional[subprocess.Popen]:
@@ -86,15 +89,28 @@ def start_api_server() -> Optional[subprocess.Popen]:
         if process.poll() is not None:
             _, stderr = process.communicate()
             stderr_text = stderr.decode('utf-8') if stderr else "未知错误"
-            logger.error(f"API服务器启动失败: {stderr_text}")
+            logger.error("API服务器启动失败: %s", stderr_text)
             return None
         
         logger.info("API服务器已启动")
         return process
     except Exception as e:
-        logger.error(f"启动API服务器时出错: {str(e)}")
+        logger.error("启动API服务器时出错: %s", e)
         return None
 
+def watch_process(process: subprocess.Popen, index: int):
+    """
+    阻塞等待子进程退出并通知主线程
+    
+    参数:
+        process: 被监视的进程
+        index: 进程编号，用于日志
+    """
+    returncode = process.wait()
+    if not stopping.is_set():
+        logger.error("进程 %s 意外退出，返回码: %s", index, returncode)
+    process_exited.set()
+
 def stop_processes(process_list: List[subprocess.Popen]):
     """
     停止所有进程
@@ -102,6 +118,7 @@ def stop_processes(process_list: List[subprocess.Popen]):
     参数:
         process_list: 进程列表
     """
+    stopping.set()
     logger.info("停止所有进程")
     
     for process in process_list:
@@ -110,7 +127,7 @@ def stop_processes(process_list: List[subprocess.Popen]):
                 process.terminate()
                 process.wait(timeout=5)
         except Exception as e:
-            logger.error(f"停止进程时出错: {str(e)}")
+            logger.error("停止进程时出错: %s", e)
             try:
                 process.kill()  # 强制终止
             except:
@@ -134,15 +151,15 @@ def check_weights_directory():
     """检查weights目录是否存在，不存在则创建"""
     weights_dir = "weights"
     if not os.path.exists(weights_dir):
-        logger.info(f"创建权重目录: {weights_dir}")
+        logger.info("创建权重目录: %s", weights_dir)
         os.makedirs(weights_dir)
     
     # 检查是否有权重文件
-    weights_files = [f for f in os.listdir(weights_dir) if f.endswith('.pt')]
+    weights_files = [f for f in os.listdir(weights_dir) if f.endswith(('.pt', '.engine'))]
     if not weights_files:
-        logger.warning("weights目录中没有发现模型权重文件 (.pt)，请确保在使用前下载并放置模型文件")
+        logger.warning("weights目录中没有发现模型权重文件 (.pt/.engine)，请确保在使用前下载并放置模型文件")
     else:
-        logger.info(f"发现以下模型权重文件: {', '.join(weights_files)}")
+        logger.info("发现以下模型权重文件: %s", ', '.join(weights_files))
 
 def main():
     """主函数"""
@@ -184,15 +201,23 @@ def main():
         
         logger.info("所有服务已启动，按Ctrl+C退出")
         
+        # 每个子进程由一个监视线程阻塞等待，退出时立即唤醒主线程
+        for i, process in enumerate(processes):
+            watcher = threading.Thread(target=watch_process, args=(process, i))
+            watcher.daemon = True
+            watcher.start()
+        
+        # Windows下无超时的Event.wait()无法被Ctrl+C中断，因此保留超时
+        wait_timeout = 1.0 if os.name == 'nt' else None
+        
         # 保持主程序运行
         while True:
-            time.sleep(1)
+            if not process_exited.wait(wait_timeout):
+                continue
+            process_exited.clear()
             
-            # 检查进程是否仍在运行
-            for i, process in enumerate(processes[:]):
-                if process.poll() is not None:
-                    logger.error(f"进程 {i} 意外退出，返回码: {process.returncode}")
-                    processes.remove(process)
+            # 移除已退出的进程
+            processes[:] = [process for process in processes if process.poll() is None]
             
             # 如果所有进程都退出了，退出主程序
             if not processes:
@@ -201,7 +226,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("接收到键盘中断，正在停止...")
     except Exception as e:
-        logger.error(f"运行时出错: {str(e)}")
+        logger.error("运行时出错: %s", e)
     finally:
         stop_processes(processes)
     
@@ -0,0 +1,163 @@
+import time
+import queue
+import threading
+import numpy as np
+from typing import Dict, List
+from yolo_obb_model import YOLOv11OBB, Detections
+from logging_config import get_logger
+
+# 配置日志
+logger = get_logger("Model-Runner")
+
+class _InferenceRequest:
+    """单帧推理请求，处理线程提交后等待推理线程填入结果"""
+    __slots__ = ('frame', 'result', 'done')
+    
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.result = Detections.empty()
+        self.done = threading.Event()
+
+class ModelRunner:
+    # 提交的请求等待推理结果的最长时间(秒)，推理线程异常退出时不会让处理线程永久阻塞
+    REQUEST_TIMEOUT = 5.0
+    
+    def __init__(
+        self,
+        model: YOLOv11OBB,
+        max_batch_size: int = 8,
+        batch_timeout: float = 0.005
+    ):
+        """
+        初始化共享模型推理器，将多路视频流的帧合并为批次推理
+        
+        参数:
+            model: 共享的YOLO-OBB模型
+            max_batch_size: 单个批次的最大帧数
+            batch_timeout: 收集批次的最长等待时间(秒)
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+        
+        self._requests: queue.Queue = queue.Queue()
+        self.is_running = False
+        self.inference_thread = None
+        
+        # 提交请求与停止/清空队列互斥，避免请求在清空之后入队而永远无人处理
+        self._submit_lock = threading.Lock()
+        
+        # 模型持有跨调用复用的缓冲区，同一时刻只允许一个线程推理
+        self._model_lock = threading.Lock()
+    
+    def start(self):
+        """启动推理线程"""
+        with self._submit_lock:
+            if self.is_running:
+                return
+            self.is_running = True
+        
+        self.inference_thread = threading.Thread(target=self._inference_loop)
+        self.inference_thread.daemon = True
+        self.inference_thread.start()
+        logger.info("批量推理线程已启动 (最大批次: %s)", self.max_batch_size)
+    
+    def stop(self):
+        """停止推理线程并释放所有等待中的请求"""
+        with self._submit_lock:
+            self.is_running = False
+        
+        if self.inference_thread:
+            self.inference_thread.join(timeout=5)
+            self.inference_thread = None
+        
+        # 唤醒仍在等待的处理线程，返回空结果；此后不会再有新请求入队
+        with self._submit_lock:
+            while True:
+                try:
+                    self._requests.get_nowait().done.set()
+                except queue.Empty:
+                    break
+        
+        logger.info("批量推理线程已停止")
+    
+    def detect(self, frame: np.ndarray) -> Detections:
+        """
+        提交一帧并阻塞等待其检测结果
+        
+        参数:
+            frame: 输入帧 (BGR格式)
+        
+        返回:
+            检测结果，格式同YOLOv11OBB.detect
+        """
+        request = _InferenceRequest(frame)
+        with self._submit_lock:
+            running = self.is_running
+            if running:
+                self._requests.put(request)
+        
+        # 推理线程未运行时在调用线程推理，多个调用线程之间串行执行
+        if not running:
+            with self._model_lock:
+                return self.model.detect(frame)
+        
+        if not request.done.wait(self.REQUEST_TIMEOUT):
+            logger.warning("等待推理结果超时 (%.1f 秒)，返回空结果", self.REQUEST_TIMEOUT)
+            return Detections.empty(self.model.class_names)
+        return request.result
+    
+    def _collect_batch(self) -> List[_InferenceRequest]:
+        """阻塞等待第一帧，然后在时间窗口内尽量收集更多帧"""
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.perf_counter() + self.batch_timeout
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _inference_loop(self):
+        """推理线程主循环"""
+        while self.is_running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            
+            with self._model_lock:
+                results = self.model.detect_batch([request.frame for request in batch])
+            for request, detections in zip(batch, results):
+                request.result = detections
+                request.done.set()
+
+# 按权重路径共享的推理器
+_shared_runners: Dict[str, ModelRunner] = {}
+_shared_runners_lock = threading.Lock()
+
+def get_shared_runner(weights_path: str, **kwargs) -> ModelRunner:
+    """
+    获取（必要时创建并启动）指定权重对应的共享推理器
+    
+    参数:
+        weights_path: 模型权重路径
+        **kwargs: 传给ModelRunner的批处理参数
+    
+    返回:
+        已启动的共享推理器
+    """
+    with _shared_runners_lock:
+        runner = _shared_runners.get(weights_path)
+        if runner is None:
+            runner = ModelRunner(YOLOv11OBB(weights_path), **kwargs)
+            _shared_runners[weights_path] = runner
+        runner.start()
+        return runner
@@ -1,21 +1,21 @@
 import cv2
 import time
-import logging
+import threading
 import numpy as np
 from typing import Optional
+from logging_config import get_logger
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("RTMP-Stream")
+logger = get_logger("RTMP-Stream")
 
 class RTMPStream:
+    # 打开和读取流的超时时间(毫秒)，使读取线程不会无限期阻塞在网络IO上
+    OPEN_TIMEOUT_MS = 5000
+    READ_TIMEOUT_MS = 3000
+    
     def __init__(
         self, 
         rtmp_url: str,
-        buffer_size: int = 10,
         reconnect_attempts: int = 5,
         reconnect_delay: int = 3
     ):
@@ -24,36 +24,62 @@ class RTMPStream:
         
         参数:
             rtmp_url: RTMP流地址
-            buffer_size: 帧缓冲区大小
             reconnect_attempts: 重连尝试次数
             reconnect_delay: 重连延迟(秒)
         """
         self.rtmp_url = rtmp_url
-        self.buffer_size = buffer_size
         self.reconnect_attempts = reconnect_attempts
         self.reconnect_delay = reconnect_delay
         self.cap = None
-        self.frame_buffer = []
-        self.is_running = False
         
+        # 由其他线程设置，使连接重试尽快放弃
+        self._interrupted = threading.Event()
+        
+        # 复用的帧缓冲区，首帧到达后按实际分辨率分配
+        self._frame_buf: Optional[np.ndarray] = None
+    
+    def _retrieve_frame(self) -> Optional[np.ndarray]:
+        """将已抓取的帧解码到复用的缓冲区，避免每帧重新分配内存"""
+        ret, frame = self.cap.retrieve(self._frame_buf)
+        if not ret:
+            return None
+        
+        # 首帧或分辨率变化时OpenCV会返回新数组，之后复用该数组
+        self._frame_buf = frame
+        return frame
+    
+    def _open_capture(self) -> cv2.VideoCapture:
+        """打开流，OpenCV支持时设置打开和读取超时"""
+        if hasattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC') and hasattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC'):
+            return cv2.VideoCapture(self.rtmp_url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.OPEN_TIMEOUT_MS,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.READ_TIMEOUT_MS
+            ])
+        return cv2.VideoCapture(self.rtmp_url)
+    
     def connect(self) -> bool:
         """连接到RTMP流"""
-        logger.info(f"正在连接到RTMP流: {self.rtmp_url}")
+        logger.info("正在连接到RTMP流: %s", self.rtmp_url)
         
         for attempt in range(self.reconnect_attempts):
+            if self._interrupted.is_set():
+                return False
+            
             try:
-                self.cap = cv2.VideoCapture(self.rtmp_url)
+                self.cap = self._open_capture()
                 if self.cap.isOpened():
                     logger.info("RTMP流连接成功")
                     return True
                 else:
-                    logger.warning(f"无法打开RTMP流，尝试 {attempt+1}/{self.reconnect_attempts}")
+                    logger.warning("无法打开RTMP流，尝试 %d/%d", attempt + 1, self.reconnect_attempts)
             except Exception as e:
-                logger.error(f"连接RTMP流时出错: {str(e)}")
+                logger.error("连接RTMP流时出错: %s", e)
             
-            time.sleep(self.reconnect_delay)
+            # 等待重连期间收到中断请求时立即放弃
+            if self._interrupted.wait(self.reconnect_delay):
+                return False
         
-        logger.error(f"在 {self.reconnect_attempts} 次尝试后无法连接到RTMP流")
+        logger.error("在 %d 次尝试后无法连接到RTMP流", self.reconnect_attempts)
         return False
     
     def read_frame(self) -> Optional[np.ndarray]:
@@ -63,8 +89,8 @@ class RTMPStream:
                 return None
         
         try:
-            ret, frame = self.cap.read()
-            if not ret:
+            frame = self._retrieve_frame() if self.cap.grab() else None
+            if frame is None:
                 logger.warning("读取帧失败，尝试重新连接")
                 self.cap.release()
                 self.cap = None
@@ -73,53 +99,40 @@ class RTMPStream:
                 return None
             return frame
         except Exception as e:
-            logger.error(f"读取帧时出错: {str(e)}")
+            logger.error("读取帧时出错: %s", e)
             self.cap.release()
             self.cap = None
             return None
     
-    def start(self):
-        """开始处理RTMP流"""
-        if not self.connect():
-            return
-        
-        self.is_running = True
-        logger.info("开始处理RTMP流")
-        
-        try:
-            while self.is_running:
-                frame = self.read_frame()
-                if frame is not None:
-                    # 管理帧缓冲区
-                    if len(self.frame_buffer) >= self.buffer_size:
-                        self.frame_buffer.pop(0)
-                    self.frame_buffer.append(frame)
-                    
-                    # 这里可以添加帧处理逻辑
-                    # process_frame(frame)
-                else:
-                    time.sleep(0.1)  # 避免CPU占用过高
-        except KeyboardInterrupt:
-            logger.info("用户中断流处理")
-        finally:
-            self.stop()
+    def interrupt(self):
+        """请求放弃正在进行的连接重试，可从其他线程调用"""
+        self._interrupted.set()
+    
+    def clear_interrupt(self):
+        """清除中断请求，允许重新连接"""
+        self._interrupted.clear()
     
     def stop(self):
         """停止处理RTMP流"""
-        self.is_running = False
         if self.cap:
             self.cap.release()
             self.cap = None
+        
+        # 已停止，后续可以重新连接
+        self._interrupted.clear()
         logger.info("RTMP流处理已停止")
-    
-    def get_latest_frame(self) -> Optional[np.ndarray]:
-        """获取最新的帧"""
-        if self.frame_buffer:
-            return self.frame_buffer[-1]
-        return None
 
 # 使用示例
 if __name__ == "__main__":
     rtmp_url = "rtmp://localhost:1935/live/stream"
     stream = RTMPStream(rtmp_url)
-    stream.start() 
\ No newline at end of file
+    
+    try:
+        while True:
+            frame = stream.read_frame()
+            if frame is None:
+                time.sleep(0.1)  # 避免CPU占用过高
+    except KeyboardInterrupt:
+        logger.info("用户中断流处理")
+    finally:
+        stream.stop() 
\ No newline at end of file
@@ -4,15 +4,11 @@ import requests
 import subprocess
 import os
 import argparse
-import logging
 from typing import Optional
+from logging_config import get_logger
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("Test-Pipeline")
+logger = get_logger("Test-Pipeline")
 
 class TestPipeline:
     def __init__(
@@ -45,6 +41,9 @@ class TestPipeline:
         
         # FFmpeg进程
         self.ffmpeg_process = None
+        
+        # 复用HTTP连接的会话，避免每次请求重新建立TCP连接
+        self.session = requests.Session()
     
     def push_video_to_rtmp(self) -> Optional[subprocess.Popen]:
         """
@@ -56,7 +55,7 @@ class TestPipeline:
         try:
             # 检查视频文件是否存在
             if not os.path.exists(self.test_video_path):
-                logger.error(f"测试视频文件不存在: {self.test_video_path}")
+                logger.error("测试视频文件不存在: %s", self.test_video_path)
                 return None
             
             # FFmpeg命令
@@ -73,7 +72,7 @@ class TestPipeline:
                 self.input_rtmp_url
             ]
             
-            logger.info(f"启动FFmpeg推流: {' '.join(command)}")
+            logger.info("启动FFmpeg推流: %s", ' '.join(command))
             
             # 创建FFmpeg进程
             process = subprocess.Popen(
@@ -88,13 +87,13 @@ class TestPipeline:
             # 检查进程是否仍在运行
             if process.poll() is not None:
                 _, stderr = process.communicate()
-                logger.error(f"FFmpeg推流启动失败: {stderr.decode('utf-8')}")
+                logger.error("FFmpeg推流启动失败: %s", stderr.decode('utf-8'))
                 return None
             
-            logger.info(f"FFmpeg推流已启动，推送到: {self.input_rtmp_url}")
+            logger.info("FFmpeg推流已启动，推送到: %s", self.input_rtmp_url)
             return process
         except Exception as e:
-            logger.error(f"启动FFmpeg推流时出错: {str(e)}")
+            logger.error("启动FFmpeg推流时出错: %s", e)
             return None
     
     def start_processing(self) -> bool:
@@ -117,18 +116,18 @@ class TestPipeline:
             }
             
             # 发送请求
-            logger.info(f"发送启动请求到API: {self.api_url}/start")
-            response = requests.post(f"{self.api_url}/start", json=data)
+            logger.info("发送启动请求到API: %s/start", self.api_url)
+            response = self.session.post(f"{self.api_url}/start", json=data)
             
             # 检查响应
             if response.status_code == 200:
                 logger.info("视频处理已成功启动")
                 return True
             else:
-                logger.error(f"启动视频处理失败: {response.text}")
+                logger.error("启动视频处理失败: %s", response.text)
                 return False
         except Exception as e:
-            logger.error(f"启动视频处理时出错: {str(e)}")
+            logger.error("启动视频处理时出错: %s", e)
             return False
     
     def monitor_metrics(self, duration: int = 60):
@@ -138,25 +137,25 @@ class TestPipeline:
         参数:
             duration: 监控持续时间（秒）
         """
-        logger.info(f"开始监控性能指标，持续 {duration} 秒")
+        logger.info("开始监控性能指标，持续 %s 秒", duration)
         
         start_time = time.time()
         while time.time() - start_time < duration:
             try:
                 # 获取状态
-                response = requests.get(f"{self.api_url}/status")
+                response = self.session.get(f"{self.api_url}/status")
                 
                 if response.status_code == 200:
                     data = response.json()
                     if data["is_processing"]:
                         metrics = data["metrics"]
-                        logger.info(f"性能指标: FPS={metrics['fps']:.1f}, 延迟={metrics['latency']:.1f}ms, 检测时间={metrics['detection_time']*1000:.1f}ms")
+                        logger.info("性能指标: FPS=%.1f, 延迟=%.1fms, 检测时间=%.1fms", metrics['fps'], metrics['latency'], metrics['detection_time']*1000)
                     else:
                         logger.warning("视频处理未运行")
                 else:
-                    logger.error(f"获取状态失败: {response.text}")
+                    logger.error("获取状态失败: %s", response.text)
             except Exception as e:
-                logger.error(f"监控指标时出错: {str(e)}")
+                logger.error("监控指标时出错: %s", e)
             
             # 每秒更新一次
             time.sleep(1)
@@ -170,18 +169,18 @@ class TestPipeline:
         """
         try:
             # 发送请求
-            logger.info(f"发送停止请求到API: {self.api_url}/stop")
-            response = requests.post(f"{self.api_url}/stop")
+            logger.info("发送停止请求到API: %s/stop", self.api_url)
+            response = self.session.post(f"{self.api_url}/stop")
             
             # 检查响应
             if response.status_code == 200:
                 logger.info("视频处理已成功停止")
                 return True
             else:
-                logger.error(f"停止视频处理失败: {response.text}")
+                logger.error("停止视频处理失败: %s", response.text)
                 return False
         except Exception as e:
-            logger.error(f"停止视频处理时出错: {str(e)}")
+            logger.error("停止视频处理时出错: %s", e)
             return False
     
     def stop_ffmpeg(self):
@@ -193,7 +192,7 @@ class TestPipeline:
                 self.ffmpeg_process.wait(timeout=5)
                 logger.info("FFmpeg推流已停止")
             except Exception as e:
-                logger.error(f"停止FFmpeg推流时出错: {str(e)}")
+                logger.error("停止FFmpeg推流时出错: %s", e)
                 try:
                     self.ffmpeg_process.kill()
                 except:
@@ -236,7 +235,7 @@ class TestPipeline:
             self.stop_processing()
             self.stop_ffmpeg()
         except Exception as e:
-            logger.error(f"测试过程中出错: {str(e)}")
+            logger.error("测试过程中出错: %s", e)
             self.stop_processing()
             self.stop_ffmpeg()
 
@@ -0,0 +1,28 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from yolo_obb_model import nms_rotated
+
+def test_nms_rotated_no_boxes():
+    """没有候选框时返回空索引而不是报错"""
+    keep = nms_rotated(torch.zeros((0, 5)), torch.zeros(0), 0.45)
+    assert keep.dtype == torch.long
+    assert keep.numel() == 0
+
+def test_nms_rotated_single_box():
+    """只有一个候选框时保留该框"""
+    boxes = torch.tensor([[100.0, 100.0, 40.0, 20.0, 0.3]])
+    keep = nms_rotated(boxes, torch.tensor([0.9]), 0.45)
+    assert keep.tolist() == [0]
+
+def test_nms_rotated_suppresses_overlapping_box():
+    """重叠的低分框被抑制，不重叠的框保留"""
+    boxes = torch.tensor([
+        [100.0, 100.0, 40.0, 20.0, 0.3],
+        [101.0, 100.0, 40.0, 20.0, 0.3],
+        [300.0, 300.0, 40.0, 20.0, 0.3],
+    ])
+    keep = nms_rotated(boxes, torch.tensor([0.8, 0.9, 0.7]), 0.45)
+    assert keep.tolist() == [1, 2]
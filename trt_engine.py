@@ -0,0 +1,192 @@
+import json
+import argparse
+import torch
+from typing import Dict, List, Optional
+from ultralytics import YOLO
+from logging_config import get_logger
+
+# 配置日志
+logger = get_logger("TRT-Engine")
+
+# TensorRT为可选依赖，仅在使用.engine模型时需要
+try:
+    import tensorrt as trt
+    TRT_AVAILABLE = True
+except ImportError:
+    TRT_AVAILABLE = False
+
+if TRT_AVAILABLE:
+    # TensorRT数据类型到PyTorch数据类型的映射
+    _TRT_TO_TORCH_DTYPE = {
+        trt.float32: torch.float32,
+        trt.float16: torch.float16,
+        trt.int32: torch.int32,
+        trt.int8: torch.int8,
+        trt.bool: torch.bool,
+    }
+    if hasattr(trt, 'int64'):
+        _TRT_TO_TORCH_DTYPE[trt.int64] = torch.int64
+
+class TRTEngine:
+    def __init__(self, engine_path: str, device: torch.device):
+        """
+        加载序列化的TensorRT引擎
+
+        参数:
+            engine_path: 引擎文件路径 (由trtexec或Ultralytics导出)
+            device: 运行设备，必须为CUDA设备
+        """
+        if not TRT_AVAILABLE:
+            raise ImportError("未安装tensorrt，无法加载TensorRT引擎")
+        if device.type != 'cuda':
+            raise ValueError(f"TensorRT引擎只能运行在CUDA设备上，当前设备: {device}")
+
+        self.engine_path = engine_path
+        self.device = device
+
+        logger.info("正在加载TensorRT引擎: %s", engine_path)
+        self._trt_logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, 'rb') as f, trt.Runtime(self._trt_logger) as runtime:
+            self.metadata = self._read_metadata(f)
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"无法反序列化TensorRT引擎: {engine_path}")
+
+        self.context = self.engine.create_execution_context()
+
+        # 专用CUDA流，推理与默认流上的其他工作相互独立
+        self.stream = torch.cuda.Stream(device=device)
+
+        # 区分输入和输出张量
+        self.input_names: List[str] = []
+        self.output_names: List[str] = []
+        for i in range(self.engine.num_io_tensors):
+            name = self.engine.get_tensor_name(i)
+            if self.engine.get_tensor_mode(name) == trt.TensorIOMode.INPUT:
+                self.input_names.append(name)
+            else:
+                self.output_names.append(name)
+
+        # 输出缓冲区在形状不变时跨调用复用
+        self._outputs: Dict[str, torch.Tensor] = {}
+
+        logger.info("TensorRT引擎加载成功，输入: %s，输出: %s", self.input_names, self.output_names)
+
+    @staticmethod
+    def _read_metadata(f) -> Optional[Dict]:
+        """
+        读取Ultralytics导出引擎文件头部的元数据（4字节小端长度 + JSON），并将文件位置移到引擎数据开头
+        
+        trtexec等工具生成的引擎文件没有该头部，此时回到文件开头并返回None
+        """
+        try:
+            meta_len = int.from_bytes(f.read(4), byteorder='little')
+            return json.loads(f.read(meta_len).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            f.seek(0)
+            return None
+    
+    def _torch_dtype(self, name: str) -> torch.dtype:
+        """获取引擎张量对应的PyTorch数据类型"""
+        return _TRT_TO_TORCH_DTYPE[self.engine.get_tensor_dtype(name)]
+
+    def infer(self, x: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """
+        执行一次推理
+
+        参数:
+            x: 输入张量 (N, 3, H, W)，位于CUDA设备上
+
+        返回:
+            输出名称到输出张量的映射（输出缓冲区在调用间复用，需在下次调用前使用完毕）
+        """
+        input_name = self.input_names[0]
+        x = x.to(self._torch_dtype(input_name)).contiguous()
+
+        # 支持动态批次：每次按实际输入形状设置并推导输出形状
+        self.context.set_input_shape(input_name, tuple(x.shape))
+        self.context.set_tensor_address(input_name, x.data_ptr())
+
+        for name in self.output_names:
+            shape = tuple(self.context.get_tensor_shape(name))
+            buf = self._outputs.get(name)
+            if buf is None or tuple(buf.shape) != shape:
+                buf = torch.empty(shape, dtype=self._torch_dtype(name), device=self.device)
+                self._outputs[name] = buf
+            self.context.set_tensor_address(name, buf.data_ptr())
+
+        # 等待默认流上的输入准备完成后再在推理流上执行
+        self.stream.wait_stream(torch.cuda.current_stream(self.device))
+        if not self.context.execute_async_v3(self.stream.cuda_stream):
+            raise RuntimeError("TensorRT推理执行失败")
+        self.stream.synchronize()
+
+        return self._outputs
+
+def export_engine(
+    weights_path: str,
+    img_size: int = 640,
+    int8: bool = True,
+    data: Optional[str] = None,
+    batch: int = 8,
+    nms: bool = True,
+    conf: float = 0.25,
+    iou: float = 0.45
+) -> str:
+    """
+    将PyTorch权重导出为TensorRT引擎，生成的.engine文件与权重位于同一目录
+    
+    INT8量化需要校准数据集，data应指向Ultralytics数据集配置文件，
+    其中包含200~500帧有代表性的画面。Ultralytics导出接口不能为单独的层指定精度，
+    OBB检测头（包括角度回归）同样会被量化；角度精度下降明显时请改为导出FP16引擎
+    
+    参数:
+        weights_path: 模型权重文件路径 (.pt)
+        img_size: 输入图像大小
+        int8: 是否进行INT8量化，否则导出FP16引擎
+        data: INT8校准数据集配置文件路径
+        batch: 引擎支持的最大批次大小
+        nms: 是否将解码和NMS一并构建进引擎，输出即为已过滤的检测结果
+        conf: 内置NMS使用的置信度阈值，默认与YOLOv11OBB一致
+        iou: 内置NMS使用的IOU阈值，默认与YOLOv11OBB一致
+        
+    返回:
+        导出的引擎文件路径
+    """
+    if int8 and data is None:
+        raise ValueError("INT8量化需要提供校准数据集配置文件 (data)")
+    
+    logger.info("正在导出TensorRT引擎: %s (精度: %s, 批次: %s)", weights_path, 'INT8' if int8 else 'FP16', batch)
+    model = YOLO(weights_path, task='obb')
+    engine_path = model.export(
+        format='engine',
+        imgsz=img_size,
+        half=not int8,
+        int8=int8,
+        data=data,
+        batch=batch,
+        dynamic=batch > 1,
+        nms=nms,
+        conf=conf,
+        iou=iou
+    )
+    logger.info("TensorRT引擎导出成功: %s", engine_path)
+    return str(engine_path)
+
+# 使用示例
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出YOLOv11-OBB TensorRT引擎")
+    parser.add_argument("weights", help="模型权重文件路径 (.pt)")
+    parser.add_argument("--img-size", type=int, default=640, help="输入图像大小")
+    parser.add_argument("--fp16", action="store_true", help="导出FP16引擎而不是INT8")
+    parser.add_argument("--data", help="INT8校准数据集配置文件路径")
+    parser.add_argument("--batch", type=int, default=8, help="最大批次大小")
+    parser.add_argument("--no-nms", action="store_true", help="不在引擎中执行NMS")
+    parser.add_argument("--conf", type=float, default=0.25, help="内置NMS的置信度阈值")
+    parser.add_argument("--iou", type=float, default=0.45, help="内置NMS的IOU阈值")
+    args = parser.parse_args()
+    
+    export_engine(
+        args.weights, args.img_size, not args.fp16, args.data, args.batch,
+        not args.no_nms, args.conf, args.iou
+    )
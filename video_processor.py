@@ -1,21 +1,107 @@
+import os
 import cv2
+import sys
 import time
+import shutil
 import subprocess
 import threading
-import logging
 import numpy as np
-from typing import Optional, Dict, List, Tuple
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Optional, Dict, Set
 from rtmp_stream import RTMPStream
 from yolo_obb_model import YOLOv11OBB
+from model_runner import ModelRunner
+from logging_config import get_logger
+
+# fcntl仅在POSIX系统上可用，用于调整FFmpeg输入管道容量
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux的F_SETPIPE_SZ，Python 3.10之前fcntl模块未导出该常量
+_F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("Video-Processor")
+logger = get_logger("Video-Processor")
+
+def _opencv_cuda_available() -> bool:
+    """检测OpenCV是否启用了CUDA模块且存在可用设备"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+@lru_cache(maxsize=None)
+def _ffmpeg_nvenc_available(ffmpeg_path: str) -> bool:
+    """
+    检测FFmpeg能否实际使用h264_nvenc编码（需编译时启用NVENC且存在可用的NVIDIA GPU）
+    
+    通过编码一帧测试画面来探测，结果按ffmpeg路径缓存
+    """
+    command = [
+        ffmpeg_path, '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'color=size=256x256',
+        '-frames:v', '1', '-c:v', 'h264_nvenc', '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=10
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def _pin_current_thread(cpus: Optional[Set[int]], realtime_priority: Optional[int] = None):
+    """
+    将当前线程绑定到指定CPU核心，并可选地设置SCHED_FIFO实时调度（仅Linux）
+    
+    参数:
+        cpus: 绑定的CPU核心集合，None或空集合表示不绑定
+        realtime_priority: SCHED_FIFO优先级(1-99)，None表示保持默认调度策略
+    """
+    # Linux下pid为0时作用于调用线程本身
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        cpus = cpus & os.sched_getaffinity(0)
+        if cpus:
+            try:
+                os.sched_setaffinity(0, cpus)
+                logger.info("线程已绑定到CPU核心: %s", sorted(cpus))
+            except OSError as e:
+                logger.warning("绑定CPU核心失败: %s", e)
+    
+    if realtime_priority is not None and hasattr(os, 'sched_setscheduler'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(realtime_priority))
+            logger.info("线程已切换为SCHED_FIFO调度，优先级: %s", realtime_priority)
+        except OSError as e:
+            logger.warning("设置SCHED_FIFO调度失败（需要CAP_SYS_NICE权限）: %s", e)
+
+# dataclass的slots参数需要Python 3.10+
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
+class Metrics:
+    """性能指标，由处理线程逐字段更新，读取时再快照为字典"""
+    fps: float = 0.0
+    latency: float = 0.0
+    detection_time: float = 0.0
+    processing_time: float = 0.0
+    dropped_frames: int = 0
 
 class VideoProcessor:
+    # 性能指标覆盖层的尺寸及刷新间隔(秒)
+    OVERLAY_SIZE = (100, 320)
+    OVERLAY_REFRESH_INTERVAL = 1.0
+    
+    # FPS指数移动平均的平滑系数
+    FPS_EMA_ALPHA = 0.1
+    
     def __init__(
         self, 
         input_rtmp_url: str,
@@ -24,7 +110,11 @@ class VideoProcessor:
         fps: int = 30,
         width: int = 1280,
         height: int = 720,
-        bitrate: str = "2000k"
+        bitrate: str = "2000k",
+        use_gpu: Optional[bool] = None,
+        model_runner: Optional[ModelRunner] = None,
+        processing_cpus: Optional[Set[int]] = None,
+        realtime_priority: Optional[int] = None
     ):
         """
         初始化视频处理器
@@ -37,52 +127,123 @@ class VideoProcessor:
             width: 输出视频宽度
             height: 输出视频高度
             bitrate: 输出视频比特率
+            use_gpu: 是否使用CUDA缩放帧并用NVENC编码，None表示自动检测；
+                     两项能力分别检测，不可用的一项回退到CPU实现
+            model_runner: 多路流共享的批量推理器，为None时独占加载模型
+            processing_cpus: 处理线程绑定的CPU核心，None表示不绑定；多路流时应为每路指定不同的核心
+            realtime_priority: 处理线程的SCHED_FIFO优先级，None表示不启用实时调度
         """
         self.input_rtmp_url = input_rtmp_url
         self.output_rtmp_url = output_rtmp_url
         self.model_weights_path = model_weights_path
         self.fps = fps
+        
+        # YUV420要求宽高为偶数（色度平面按2x2下采样），奇数尺寸向下取整
+        if width % 2 or height % 2:
+            logger.warning("输出尺寸 %dx%d 不是偶数，调整为 %dx%d", width, height, width & ~1, height & ~1)
+            width &= ~1
+            height &= ~1
         self.width = width
         self.height = height
         self.bitrate = bitrate
+        self.use_gpu = use_gpu
+        
+        # OpenCV CUDA缩放与NVENC编码相互独立，分别判断（NVENC在启动FFmpeg时探测）
+        self.cuda_resize = use_gpu is not False and _opencv_cuda_available()
+        if use_gpu and not self.cuda_resize:
+            logger.warning("OpenCV未启用CUDA或无可用设备，帧缩放回退到CPU")
+        
+        # 线程CPU亲和性（可选），减少与事件循环之间的缓存抖动和抢占
+        self.processing_cpus = processing_cpus
+        self.realtime_priority = realtime_priority
+        
+        # GPU缩放使用的显存缓冲区，跨帧复用
+        self._gpu_frame = cv2.cuda_GpuMat() if self.cuda_resize else None
+        
+        # 缓存的性能指标覆盖层，仅在指标刷新时重新渲染文字
+        self._overlay = np.zeros((*self.OVERLAY_SIZE, 3), np.uint8)
+        self._overlay_mask = np.zeros((*self.OVERLAY_SIZE, 1), bool)
+        self._overlay_time = float('-inf')
+        
+        # 复用的输出帧缓冲区，检测结果直接绘制到其中
+        self._out_frame = np.empty((height, width, 3), np.uint8)
+        
+        # 推流使用YUV420(I420)像素格式，数据量仅为BGR24的一半
+        self._yuv_frame = np.empty((height * 3 // 2, width), np.uint8)
+        
+        # 未能一次写完的帧的剩余部分，下一帧写入前先续写，保证原始视频流的帧对齐
+        self._pending_buf = bytearray(self._yuv_frame.nbytes)
+        self._pending: Optional[memoryview] = None
         
         # 初始化RTMP流读取器
         self.stream_reader = RTMPStream(input_rtmp_url)
         
-        # 初始化YOLO-OBB模型
-        self.model = YOLOv11OBB(model_weights_path)
+        # 初始化YOLO-OBB模型，使用共享推理器时复用其模型
+        self.model_runner = model_runner
+        if model_runner is not None:
+            self.model = model_runner.model
+        else:
+            self.model = YOLOv11OBB(model_weights_path)
+            self._warmup_model()
         
         # 初始化FFmpeg进程
         self.ffmpeg_process = None
+        self._nonblocking_stdin = False
         
         # 处理状态
         self.is_processing = False
         self.processing_thread = None
         
         # 性能指标
-        self.metrics = {
-            'fps': 0,
-            'latency': 0,
-            'detection_time': 0,
-            'processing_time': 0
-        }
+        self.metrics = Metrics()
+    
+    def _warmup_model(self, iterations: int = 1):
+        """
+        使用输出尺寸的空白帧预热完整检测流程
+        
+        模型加载时已在固定输入尺寸上预热推理，这里只需一次检测，
+        让预处理内核编译并按实际帧尺寸分配预处理和上传缓冲区
+        
+        参数:
+            iterations: 预热检测次数
+        """
+        logger.info("预热模型 (%s 次推理)", iterations)
+        dummy = np.zeros((self.height, self.width, 3), np.uint8)
+        for _ in range(iterations):
+            self.model.detect(dummy)
     
     def _init_ffmpeg(self):
         """初始化FFmpeg进程用于RTMP推流"""
         try:
+            # 使用ffmpeg的绝对路径，这是CPython走posix_spawn快速路径的前提之一
+            ffmpeg_path = shutil.which('ffmpeg')
+            if ffmpeg_path is None:
+                logger.error("未找到ffmpeg可执行文件，请确认已安装并加入PATH")
+                return False
+            
+            # 编码器参数：FFmpeg支持且可用时使用NVENC硬件编码
+            use_nvenc = self.use_gpu is not False and _ffmpeg_nvenc_available(ffmpeg_path)
+            if self.use_gpu and not use_nvenc:
+                logger.warning("FFmpeg不支持h264_nvenc或无可用GPU，回退到libx264编码")
+            
+            if use_nvenc:
+                encoder_args = ['-c:v', 'h264_nvenc', '-preset', 'p1', '-tune', 'll']
+            else:
+                encoder_args = ['-c:v', 'libx264', '-preset', 'ultrafast']
+            
             # FFmpeg命令
             command = [
-                'ffmpeg',
+                ffmpeg_path,
                 '-y',  # 覆盖输出文件
+                '-loglevel', 'error',  # stderr管道无人读取，避免进度输出写满管道阻塞FFmpeg
                 '-f', 'rawvideo',
                 '-vcodec', 'rawvideo',
-                '-pixel_format', 'bgr24',
+                '-pixel_format', 'yuv420p',
                 '-video_size', f"{self.width}x{self.height}",
                 '-framerate', str(self.fps),
                 '-i', '-',  # 从stdin读取
-                '-c:v', 'libx264',
+                *encoder_args,
                 '-pix_fmt', 'yuv420p',
-                '-preset', 'ultrafast',
                 '-b:v', self.bitrate,
                 '-maxrate', self.bitrate,
                 '-bufsize', self.bitrate,
@@ -90,21 +251,109 @@ class VideoProcessor:
                 self.output_rtmp_url
             ]
             
-            logger.info(f"启动FFmpeg推流: {' '.join(command)}")
+            logger.info("启动FFmpeg推流: %s", ' '.join(command))
             
             # 创建FFmpeg进程
+            # close_fds=False且不使用preexec_fn/cwd时，CPython使用posix_spawn代替fork+exec，
+            # 避免复制已加载模型的大进程页表；Python创建的文件描述符默认不可继承，不会泄漏给子进程
             self.ffmpeg_process = subprocess.Popen(
                 command,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE
+                stderr=subprocess.PIPE,
+                close_fds=False
             )
             
+            # POSIX下将stdin设为非阻塞，编码器跟不上时丢帧而不是阻塞处理线程
+            if os.name == 'posix':
+                fd = self.ffmpeg_process.stdin.fileno()
+                os.set_blocking(fd, False)
+                self._nonblocking_stdin = True
+                self._pending = None
+                self._grow_pipe(fd, self._yuv_frame.nbytes)
+            
             logger.info("FFmpeg进程已启动")
             return True
         except Exception as e:
-            logger.error(f"初始化FFmpeg时出错: {str(e)}")
+            logger.error("初始化FFmpeg时出错: %s", e)
+            return False
+    
+    def _grow_pipe(self, fd: int, size: int):
+        """
+        将管道容量扩大到至少一帧（仅Linux），使管道有空间时能容纳整帧而不是只写入一部分
+        
+        参数:
+            fd: 管道写端的文件描述符
+            size: 期望的管道容量(字节)，受/proc/sys/fs/pipe-max-size限制
+        """
+        if fcntl is None or not sys.platform.startswith('linux'):
+            return
+        
+        try:
+            with open('/proc/sys/fs/pipe-max-size') as f:
+                size = min(size, int(f.read()))
+        except (OSError, ValueError):
+            pass
+        
+        try:
+            actual = fcntl.fcntl(fd, _F_SETPIPE_SZ, size)
+            logger.info("FFmpeg输入管道容量: %s 字节 (每帧 %s 字节)", actual, self._yuv_frame.nbytes)
+        except OSError as e:
+            logger.warning("调整FFmpeg输入管道容量失败: %s", e)
+    
+    def _flush_pending(self, fd: int) -> bool:
+        """
+        非阻塞地续写上一帧未写完的部分
+        
+        返回:
+            是否已全部写完
+        """
+        while self._pending is not None:
+            try:
+                written = os.write(fd, self._pending)
+            except BlockingIOError:
+                return False
+            if written >= len(self._pending):
+                self._pending = None
+            else:
+                self._pending = self._pending[written:]
+        return True
+    
+    def _write_frame(self, frame: np.ndarray) -> bool:
+        """
+        将一帧写入FFmpeg管道
+        
+        参数:
+            frame: 连续存储的待编码帧
+            
+        返回:
+            是否写入（未写完的部分会在后续调用中续写），编码器积压时丢弃该帧并返回False
+        """
+        # 直接写入连续数组的内存视图，避免tobytes()的整帧拷贝
+        data = memoryview(frame).cast('B')
+        stdin = self.ffmpeg_process.stdin
+        
+        if not self._nonblocking_stdin:
+            stdin.write(data)
+            return True
+        
+        # 上一帧还没写完说明编码器仍然积压，丢弃当前帧
+        fd = stdin.fileno()
+        if not self._flush_pending(fd):
             return False
+        
+        try:
+            written = os.write(fd, data)
+        except BlockingIOError:
+            return False
+        
+        # 帧一旦开始写入必须完整写完：剩余部分拷贝出来（frame缓冲区会被下一帧复用），
+        # 下一次调用时续写，处理线程不在这里等待
+        if written < len(data):
+            remaining = len(data) - written
+            self._pending_buf[:remaining] = data[written:]
+            self._pending = memoryview(self._pending_buf)[:remaining]
+        return True
     
     def _process_frame(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -120,118 +369,176 @@ class VideoProcessor:
             return None
         
         # 调整帧大小
-        frame = cv2.resize(frame, (self.width, self.height))
-        
-        # 记录开始时间
-        start_time = time.time()
+        frame = self._resize_frame(frame)
         
-        # 运行目标检测
-        detections = self.model.detect(frame)
+        # 记录开始时间（单调高精度时钟）
+        t0 = time.perf_counter()
         
-        # 记录检测时间
-        detection_time = time.time() - start_time
-        self.metrics['detection_time'] = detection_time
+        # 运行目标检测，共享推理器会将多路流的帧合并为批次
+        if self.model_runner is not None:
+            detections = self.model_runner.detect(frame)
+        else:
+            detections = self.model.detect(frame)
+        t1 = time.perf_counter()
         
-        # 绘制检测结果
-        processed_frame = self.model.draw_detections(frame, detections)
+        # 绘制检测结果到复用的输出缓冲区
+        processed_frame = self.model.draw_detections(frame, detections, out=self._out_frame)
         
         # 添加性能指标
         self._draw_metrics(processed_frame)
         
-        # 记录总处理时间
-        processing_time = time.time() - start_time
-        self.metrics['processing_time'] = processing_time
+        # 记录检测时间和总处理时间
+        t2 = time.perf_counter()
+        self.metrics.detection_time = t1 - t0
+        self.metrics.processing_time = t2 - t0
         
         return processed_frame
     
-    def _draw_metrics(self, frame: np.ndarray):
-        """在帧上绘制性能指标"""
+    def _resize_frame(self, frame: np.ndarray) -> np.ndarray:
+        """将帧缩放到输出尺寸，GPU可用时在显存中完成缩放"""
+        # 输入尺寸已与输出一致时跳过缩放
+        if frame.shape[0] == self.height and frame.shape[1] == self.width:
+            return frame
+        
+        if self.cuda_resize:
+            self._gpu_frame.upload(frame)
+            resized = cv2.cuda.resize(self._gpu_frame, (self.width, self.height))
+            return resized.download()
+        # 缩小时使用INTER_AREA，避免下采样混叠
+        shrinking = frame.shape[0] > self.height or frame.shape[1] > self.width
+        interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+        return cv2.resize(frame, (self.width, self.height), interpolation=interpolation)
+    
+    def _to_yuv420(self, frame: np.ndarray) -> np.ndarray:
+        """将BGR帧转换为I420格式并写入复用的缓冲区"""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=self._yuv_frame)
+    
+    def _render_overlay(self):
+        """将当前性能指标渲染到缓存的覆盖层中"""
+        self._overlay.fill(0)
+        
         # 帧率
-        fps_text = f"FPS: {self.metrics['fps']:.1f}"
+        fps_text = f"FPS: {self.metrics.fps:.1f}"
         cv2.putText(
-            frame, fps_text, (10, 30), 
+            self._overlay, fps_text, (10, 30), 
             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2
         )
         
         # 延迟
-        latency_text = f"Latency: {self.metrics['latency']:.1f} ms"
+        latency_text = f"Latency: {self.metrics.latency:.1f} ms"
         cv2.putText(
-            frame, latency_text, (10, 60), 
+            self._overlay, latency_text, (10, 60), 
             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2
         )
         
         # 检测时间
-        det_time_text = f"Det Time: {self.metrics['detection_time']*1000:.1f} ms"
+        det_time_text = f"Det Time: {self.metrics.detection_time*1000:.1f} ms"
         cv2.putText(
-            frame, det_time_text, (10, 90), 
+            self._overlay, det_time_text, (10, 90), 
             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2
         )
+        
+        # 文字像素作为贴图掩码，其余区域保留原始画面
+        np.any(self._overlay, axis=2, out=self._overlay_mask[..., 0])
+        self._overlay_time = time.monotonic()
+    
+    def _draw_metrics(self, frame: np.ndarray):
+        """在帧上绘制性能指标"""
+        # 指标文字每秒最多重新渲染一次，其余帧直接贴图
+        if time.monotonic() - self._overlay_time >= self.OVERLAY_REFRESH_INTERVAL:
+            self._render_overlay()
+        
+        h = min(frame.shape[0], self._overlay.shape[0])
+        w = min(frame.shape[1], self._overlay.shape[1])
+        np.copyto(
+            frame[:h, :w], self._overlay[:h, :w],
+            where=self._overlay_mask[:h, :w]
+        )
     
     def _processing_loop(self):
+        """处理线程入口，无论以何种方式退出都释放FFmpeg进程和RTMP流"""
+        _pin_current_thread(self.processing_cpus, self.realtime_priority)
+        
+        try:
+            self._run_processing()
+        finally:
+            self._release_resources()
+    
+    def _run_processing(self):
         """视频处理主循环"""
         # 初始化FFmpeg
         if not self._init_ffmpeg():
             logger.error("无法启动处理循环，FFmpeg初始化失败")
             return
         
-        # 帧计数和FPS计算
-        frame_count = 0
-        fps_start_time = time.time()
+        # FPS使用帧间隔的指数移动平均，基于单调时钟计算
+        prev_frame_ns = None
         
         logger.info("开始视频处理循环")
         
         while self.is_processing:
-            # 获取开始时间用于计算延迟
-            start_time = time.time()
+            # 在处理线程中直接读取下一帧，无需跨线程交接。
+            # 注意：同步读取不再有“最新帧优先”的丢帧行为，处理速度低于输入帧率时，
+            # 未读取的帧会积压在解码器和网络缓冲中，输入延迟随之增长
+            frame = self.stream_reader.read_frame()
             
-            # 获取最新帧
-            frame = self.stream_reader.get_latest_frame()
+            # 获取开始时间用于计算延迟（不计入等待新帧的时间）
+            start_time = time.perf_counter()
             
-            if frame is not None:
+            if frame is None:
+                time.sleep(0.1)  # 重连失败时避免CPU占用过高
+            else:
                 # 处理帧
                 processed_frame = self._process_frame(frame)
                 
                 if processed_frame is not None:
                     # 计算延迟
-                    latency = (time.time() - start_time) * 1000  # 毫秒
-                    self.metrics['latency'] = latency
+                    latency = (time.perf_counter() - start_time) * 1000  # 毫秒
+                    self.metrics.latency = latency
                     
                     # 将处理后的帧写入FFmpeg进程
                     try:
-                        self.ffmpeg_process.stdin.write(processed_frame.tobytes())
+                        yuv_frame = self._to_yuv420(processed_frame)
+                        if not self._write_frame(yuv_frame):
+                            # 编码器积压时丢弃当前帧，避免延迟持续增长
+                            self.metrics.dropped_frames += 1
+                            continue
                     except BrokenPipeError:
                         logger.error("FFmpeg进程管道已断开")
                         break
                     except Exception as e:
-                        logger.error(f"写入FFmpeg进程时出错: {str(e)}")
+                        logger.error("写入FFmpeg进程时出错: %s", e)
                         break
                     
-                    # 更新帧计数
-                    frame_count += 1
-                    
-                    # 每秒计算一次FPS
-                    if frame_count % 30 == 0:
-                        current_time = time.time()
-                        elapsed = current_time - fps_start_time
-                        if elapsed > 0:
-                            self.metrics['fps'] = frame_count / elapsed
-                            frame_count = 0
-                            fps_start_time = current_time
-            else:
-                # 如果没有帧，短暂休眠以减少CPU使用
-                time.sleep(0.01)
+                    # 每帧更新FPS
+                    now_ns = time.perf_counter_ns()
+                    if prev_frame_ns is not None and now_ns > prev_frame_ns:
+                        instant_fps = 1e9 / (now_ns - prev_frame_ns)
+                        if self.metrics.fps:
+                            self.metrics.fps += self.FPS_EMA_ALPHA * (instant_fps - self.metrics.fps)
+                        else:
+                            self.metrics.fps = instant_fps
+                    prev_frame_ns = now_ns
         
+    def _release_resources(self):
+        """关闭FFmpeg进程并停止RTMP流读取"""
         # 关闭FFmpeg进程
         if self.ffmpeg_process:
             logger.info("关闭FFmpeg进程")
+            if self._pending is not None:
+                logger.warning("停止时最后一帧未写完，丢弃剩余的 %s 字节", len(self._pending))
+                self._pending = None
             try:
                 self.ffmpeg_process.stdin.close()
                 self.ffmpeg_process.wait(timeout=5)
             except Exception as e:
-                logger.error(f"关闭FFmpeg进程时出错: {str(e)}")
+                logger.error("关闭FFmpeg进程时出错: %s", e)
                 self.ffmpeg_process.kill()
             
             self.ffmpeg_process = None
+        
+        # 停止RTMP流读取（VideoCapture只在处理线程中使用，也在这里释放）
+        self.stream_reader.stop()
     
     def start(self):
         """启动视频处理"""
@@ -241,11 +548,9 @@ class VideoProcessor:
         
         logger.info("启动视频处理")
         
-        # 启动RTMP流读取
-        self.stream_reader.start()
-        
-        # 设置处理状态
+        # 设置处理状态，并清除上一次stop()留下的中断请求
         self.is_processing = True
+        self.stream_reader.clear_interrupt()
         
         # 启动处理线程
         self.processing_thread = threading.Thread(target=self._processing_loop)
@@ -262,22 +567,24 @@ class VideoProcessor:
         
         logger.info("停止视频处理")
         
-        # 设置处理状态
+        # 设置处理状态，并让可能正在进行的重连尽快放弃
         self.is_processing = False
+        self.stream_reader.interrupt()
         
-        # 等待处理线程结束
+        # 等待处理线程结束。线程仍持有VideoCapture和FFmpeg管道，在它退出前不能丢弃句柄，
+        # 否则调用方可能在旧线程释放资源前启动新的处理器；读取和关闭FFmpeg都有超时，等待是有界的
         if self.processing_thread:
             self.processing_thread.join(timeout=5)
+            if self.processing_thread.is_alive():
+                logger.warning("处理线程仍在读取帧或关闭FFmpeg，继续等待其退出")
+                self.processing_thread.join()
             self.processing_thread = None
         
-        # 停止RTMP流读取
-        self.stream_reader.stop()
-        
         logger.info("视频处理已停止")
     
     def get_metrics(self) -> Dict:
-        """获取性能指标"""
-        return self.metrics
+        """获取性能指标快照"""
+        return asdict(self.metrics)
 
 # 使用示例
 if __name__ == "__main__":
@@ -1,16 +1,203 @@
 import os
+import contextlib
 import cv2
 import torch
+import torch.nn.functional as F
 import numpy as np
-import logging
-from typing import List, Dict, Tuple, Optional, Union
+from dataclasses import dataclass
+from functools import lru_cache
+from ultralytics import YOLO
+from ultralytics.utils.metrics import batch_probiou
+from typing import List, Dict, Tuple, Optional, Sequence
+from logging_config import get_logger
+from trt_engine import TRTEngine, TRT_AVAILABLE
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logger = get_logger("YOLO-OBB")
+
+# 允许FP32矩阵乘法使用TF32等更快的实现
+torch.set_float32_matmul_precision('high')
+
+# 输入尺寸固定，让cuDNN为每种输入形状选择最快的卷积算法
+torch.backends.cudnn.benchmark = True
+
+# Numba为可选依赖，不可用时回退到OpenCV/NumPy预处理
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# uint8像素值到归一化float32的查找表，用查表代替逐像素的除法
+_NORM_LUT = np.arange(256, dtype=np.float32) / np.float32(255.0)
+
+if NUMBA_AVAILABLE:
+    # 每路视频流的模型在各自的处理线程中并发调用，不使用parallel
+    # （Numba默认的workqueue线程层不支持并发调用），多路流之间本身已经并行
+    @njit(fastmath=True, cache=True)
+    def _fuse_rgb_chw_norm(src, lut, out):
+        """
+        融合的预处理内核：BGR转RGB + 归一化 + HWC转CHW
+        
+        缩放后的图像只读取一次、写入一次，避免cvtColor、transpose和除法各自遍历整幅图像
+        
+        参数:
+            src: 缩放后的图像 (img_size, img_size, 3) uint8, BGR格式
+            lut: 256项归一化查找表 float32
+            out: 输出数组 (3, img_size, img_size) float32, RGB格式
+        """
+        h, w = src.shape[0], src.shape[1]
+        for y in range(h):
+            for x in range(w):
+                out[0, y, x] = lut[src[y, x, 2]]
+                out[1, y, x] = lut[src[y, x, 1]]
+                out[2, y, x] = lut[src[y, x, 0]]
+    
+    # 绘制在各处理线程中并发调用，不使用parallel（Numba默认的workqueue线程层不支持并发调用）；
+    # 每帧只有几十个框，串行循环已经足够
+    @njit(fastmath=True, cache=True)
+    def _obb_to_corners(boxes, out):
+        """
+        计算旋转框的整数角点，角点顺序与cv2.boxPoints一致
+        
+        参数:
+            boxes: 旋转框数组 (N, 5) float32，每行为 [cx, cy, w, h, angle]，angle为弧度
+            out: 输出数组 (N, 4, 2) int32
+        """
+        for i in range(boxes.shape[0]):
+            cx, cy = boxes[i, 0], boxes[i, 1]
+            c = np.cos(boxes[i, 4])
+            s = np.sin(boxes[i, 4])
+            dx = boxes[i, 2] * 0.5
+            dy = boxes[i, 3] * 0.5
+            for k in range(4):
+                u = -dx if k < 2 else dx
+                v = dy if k == 0 or k == 3 else -dy
+                out[i, k, 0] = np.int32(cx + u * c - v * s)
+                out[i, k, 1] = np.int32(cy + u * s + v * c)
+
+# 按类别NMS时叠加到中心坐标上的分组偏移，使不同分组（图像、类别）的框互不重叠
+_NMS_CLASS_OFFSET = 7680.0
+
+def nms_rotated(boxes: torch.Tensor, scores: torch.Tensor, iou_threshold: float) -> torch.Tensor:
+    """
+    旋转框NMS，使用概率IoU (ProbIoU) 度量旋转框之间的重叠
+    
+    参数:
+        boxes: 旋转框 (N, 5)，每行为 [cx, cy, w, h, angle]，angle为弧度
+        scores: 置信度 (N,)
+        iou_threshold: IOU阈值
+        
+    返回:
+        保留的框索引，按置信度降序
+    """
+    if boxes.shape[0] == 0:
+        return boxes.new_zeros(0, dtype=torch.long)
+    
+    order = scores.argsort(descending=True)
+    ious = batch_probiou(boxes[order], boxes[order]).triu_(diagonal=1)
+    
+    # 保留与所有更高分框的IoU都低于阈值的框
+    keep = ((ious >= iou_threshold).sum(dim=0) == 0).nonzero().squeeze_(-1)
+    return order[keep]
+
+# 旋转框四个角点在框局部坐标系中的单位偏移，顺序与cv2.boxPoints一致
+_BOX_CORNER_OFFSETS = np.array(
+    [[-0.5, 0.5], [-0.5, -0.5], [0.5, -0.5], [0.5, 0.5]], dtype=np.float32
 )
-logger = logging.getLogger("YOLO-OBB")
+
+def obb_corners(boxes: np.ndarray) -> np.ndarray:
+    """
+    一次计算所有旋转框的四个角点
+    
+    参数:
+        boxes: 旋转框数组 (N, 5)，每行为 [cx, cy, w, h, angle]，angle为弧度
+        
+    返回:
+        角点数组 (N, 4, 2)
+    """
+    cos = np.cos(boxes[:, 4])[:, None]
+    sin = np.sin(boxes[:, 4])[:, None]
+    
+    # 角点在框局部坐标系中的偏移 (N, 4)
+    u = _BOX_CORNER_OFFSETS[:, 0] * boxes[:, 2:3]
+    v = _BOX_CORNER_OFFSETS[:, 1] * boxes[:, 3:4]
+    
+    # 旋转后平移到框中心
+    corners = np.empty((len(boxes), 4, 2), dtype=np.float32)
+    corners[:, :, 0] = boxes[:, 0:1] + u * cos - v * sin
+    corners[:, :, 1] = boxes[:, 1:2] + u * sin + v * cos
+    return corners
+
+def obb_to_corners(boxes: np.ndarray) -> np.ndarray:
+    """
+    计算所有旋转框的整数角点，可用时使用Numba内核，否则回退到NumPy实现
+    
+    参数:
+        boxes: 旋转框数组 (N, 5)，每行为 [cx, cy, w, h, angle]，angle为弧度
+        
+    返回:
+        角点数组 (N, 4, 2) int32
+    """
+    out = np.empty((len(boxes), 4, 2), dtype=np.int32)
+    if NUMBA_AVAILABLE:
+        _obb_to_corners(np.ascontiguousarray(boxes, dtype=np.float32), out)
+    else:
+        out[...] = obb_corners(boxes)
+    return out
+
+@lru_cache(maxsize=4096)
+def _text_size(label: str, font_scale: float, thickness: int) -> Tuple[Tuple[int, int], int]:
+    """缓存cv2.getTextSize的结果，相同标签无需重复测量"""
+    return cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+
+@dataclass(eq=False)
+class Detections:
+    """
+    单幅图像的检测结果，按字段连续存储（结构数组布局）
+    
+    属性:
+        boxes: (N, 5) float32 旋转框 [cx, cy, w, h, angle]，angle为弧度
+        confs: (N,) float32 置信度
+        cls_ids: (N,) int64 类别ID
+        class_names: 类别名称表，as_dicts时用于查找类别名称
+    """
+    boxes: np.ndarray
+    confs: np.ndarray
+    cls_ids: np.ndarray
+    class_names: Sequence[str] = ()
+    
+    def __len__(self) -> int:
+        return len(self.confs)
+    
+    @classmethod
+    def empty(cls, class_names: Sequence[str] = ()) -> 'Detections':
+        """创建不含任何目标的检测结果"""
+        return cls(
+            np.zeros((0, 5), np.float32),
+            np.zeros(0, np.float32),
+            np.zeros(0, np.int64),
+            class_names
+        )
+    
+    def as_dicts(self) -> List[Dict]:
+        """
+        转换为字典列表格式，兼容旧接口
+        
+        返回:
+            检测结果列表，每个结果包含box、conf、cls_id和cls_name
+        """
+        return [
+            {
+                'box': box,
+                'conf': conf,
+                'cls_id': cls_id,
+                'cls_name': self.class_names[cls_id]
+            }
+            for box, conf, cls_id in zip(
+                self.boxes.tolist(), self.confs.tolist(), self.cls_ids.tolist()
+            )
+        ]
 
 class YOLOv11OBB:
     def __init__(
@@ -19,7 +206,8 @@ class YOLOv11OBB:
         conf_threshold: float = 0.25,
         iou_threshold: float = 0.45,
         img_size: int = 640,
-        device: str = None
+        device: str = None,
+        engine_path: Optional[str] = None
     ):
         """
         初始化YOLOv11-OBB模型
@@ -30,18 +218,51 @@ class YOLOv11OBB:
             iou_threshold: IOU阈值
             img_size: 输入图像大小
             device: 运行设备 ('cpu', 'cuda', 'cuda:0', 等)
+            engine_path: TensorRT引擎文件路径，提供时使用TensorRT推理；
+                         weights_path以.engine结尾时也视为引擎文件
         """
         self.weights_path = weights_path
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         self.img_size = img_size
         
+        # 输入尺寸固定，预先计算每帧都要用到的派生常量
+        self._dsize = (img_size, img_size)
+        self._inv_img_size = 1.0 / img_size
+        
+        if engine_path is None and weights_path.endswith('.engine'):
+            engine_path = weights_path
+        self.engine_path = engine_path
+        self.engine = None
+        self.model = None
+        self.use_amp = False
+        
+        # CPU预处理缓冲区：缩放结果 (img_size, img_size, 3) 和
+        # 输出 (N, 3, img_size, img_size)，后者按需增大，均跨调用复用
+        self._resize_buf = np.empty((img_size, img_size, 3), dtype=np.uint8)
+        self._chw_buf = np.empty((0, 3, img_size, img_size), dtype=np.float32)
+        
         # 如果未指定设备，自动检测
         if device is None:
             self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         else:
             self.device = torch.device(device)
         
+        # CUDA上在GPU完成预处理，使用独立的流与上一批的推理重叠；
+        # 推理也使用专用流，不与其他模型实例在默认流上相互串行
+        if self.device.type == 'cuda':
+            self._preprocess_stream = torch.cuda.Stream(device=self.device)
+            self._infer_stream = torch.cuda.Stream(device=self.device)
+        else:
+            self._preprocess_stream = None
+            self._infer_stream = None
+        
+        # 批次中每个位置对应一个锁页内存上传缓冲区，按帧尺寸分配并跨调用复用
+        self._host_in: List[torch.Tensor] = []
+        
+        # 检测结果拷回主机用的锁页内存缓冲区 (行数, 7)，按需增大并跨调用复用
+        self._out_host: Optional[torch.Tensor] = None
+        
         # 加载模型
         self._load_model()
         
@@ -50,28 +271,79 @@ class YOLOv11OBB:
         
         # 生成颜色映射
         self.colors = self._generate_colors()
+        self.colors_np = np.array(self.colors, dtype=np.int32)
+        
+        # 预先触发角点内核的JIT编译，避免第一帧绘制时卡顿
+        obb_to_corners(np.zeros((1, 5), dtype=np.float32))
         
     def _load_model(self):
         """加载YOLOv11-OBB模型"""
         try:
-            logger.info(f"正在加载YOLOv11-OBB模型: {self.weights_path}")
+            # 未指定引擎时，优先使用与权重同名的.engine文件（例如export_engine导出的INT8引擎）
+            auto_engine = False
+            if self.engine_path is None and self.device.type == 'cuda' and TRT_AVAILABLE:
+                candidate = os.path.splitext(self.weights_path)[0] + '.engine'
+                if os.path.exists(candidate):
+                    self.engine_path = candidate
+                    auto_engine = True
+            
+            # 优先使用TensorRT引擎
+            if self.engine_path is not None:
+                try:
+                    if not os.path.exists(self.engine_path):
+                        raise FileNotFoundError(f"TensorRT引擎文件不存在: {self.engine_path}")
+                    self.engine = TRTEngine(self.engine_path, self.device)
+                    self._warmup()
+                    logger.info("使用TensorRT引擎推理，运行设备: %s", self.device)
+                    return
+                except Exception as e:
+                    # 显式指定的引擎加载失败时报错；自动发现的引擎失败时回退到PyTorch权重
+                    if not auto_engine:
+                        raise
+                    logger.warning("加载TensorRT引擎 %s 失败，回退到PyTorch权重: %s", self.engine_path, e)
+                    self.engine = None
+                    self.engine_path = None
+            
+            logger.info("正在加载YOLOv11-OBB模型: %s", self.weights_path)
             # 检查权重文件是否存在
             if not os.path.exists(self.weights_path):
                 raise FileNotFoundError(f"模型权重文件不存在: {self.weights_path}")
             
-            # 使用PyTorch加载模型
-            # 注意: 这里使用的是伪代码，实际实现需要根据YOLOv11-OBB的具体API
-            self.model = torch.hub.load('ultralytics/yolov11-obb', 'custom', path=self.weights_path)
-            self.model.conf = self.conf_threshold
-            self.model.iou = self.iou_threshold
+            # 直接从本地权重加载，无需联网克隆仓库。只取出融合后的底层网络，
+            # 预处理、解码和NMS由本类完成，不经过Ultralytics的预测器
+            self.model = YOLO(self.weights_path, task='obb').model.fuse(verbose=False)
             self.model.to(self.device)
             self.model.eval()
             
-            logger.info(f"模型加载成功，运行设备: {self.device}")
+            # CUDA上使用FP16和channels_last布局，使卷积走Tensor Core
+            if self.device.type == 'cuda':
+                self.model = self.model.to(memory_format=torch.channels_last).half()
+                self.use_amp = True
+            
+            self._warmup()
+            logger.info("模型加载成功，运行设备: %s", self.device)
         except Exception as e:
-            logger.error(f"加载模型时出错: {str(e)}")
+            logger.error("加载模型时出错: %s", e)
             raise
     
+    def _warmup(self, iterations: int = 3):
+        """
+        在CUDA设备上用全零输入预热推理，使首帧不承担内核加载、cuDNN算法选择等冷启动开销
+        
+        参数:
+            iterations: 预热推理次数
+        """
+        if self.device.type != 'cuda':
+            return
+        
+        dummy = self._to_model_input(
+            torch.zeros((1, 3, self.img_size, self.img_size), device=self.device)
+        )
+        with self._stream_context():
+            for _ in range(iterations):
+                self._forward(dummy)
+        torch.cuda.synchronize(self.device)
+    
     def _load_class_names(self) -> List[str]:
         """加载类别名称"""
         # 这里应该从配置文件或模型中加载实际的类别名称
@@ -95,25 +367,133 @@ class YOLOv11OBB:
     def _generate_colors(self) -> List[Tuple[int, int, int]]:
         """为每个类别生成唯一的颜色"""
         np.random.seed(42)  # 固定随机种子以保持颜色一致
-        return [(np.random.randint(0, 255), np.random.randint(0, 255), np.random.randint(0, 255)) 
+        # 转换为Python原生int，OpenCV绘制时无需再转换NumPy标量
+        return [(int(np.random.randint(0, 255)), int(np.random.randint(0, 255)), int(np.random.randint(0, 255)))
                 for _ in range(len(self.class_names))]
     
-    def preprocess(self, img: np.ndarray) -> torch.Tensor:
-        """预处理图像用于模型输入"""
-        # 调整图像大小
-        img = cv2.resize(img, (self.img_size, self.img_size))
+    def preprocess(self, img: np.ndarray, out: Optional[np.ndarray] = None) -> torch.Tensor:
+        """
+        预处理单幅图像
+        
+        参数:
+            img: 输入图像 (BGR格式)
+            out: 可选的 (3, img_size, img_size) float32输出缓冲区
+            
+        返回:
+            CPU上的 (3, img_size, img_size) float32张量（提供out时与其共享内存）
+        """
+        if out is None:
+            out = np.empty((3, self.img_size, self.img_size), dtype=np.float32)
+        
+        # 调整图像大小（OpenCV的SIMD实现），直接写入预分配的缓冲区
+        resized = cv2.resize(
+            img, self._dsize,
+            dst=self._resize_buf, interpolation=cv2.INTER_LINEAR
+        )
+        
+        if NUMBA_AVAILABLE:
+            # 单个内核完成通道转换、归一化和布局转换
+            _fuse_rgb_chw_norm(resized, _NORM_LUT, out)
+        else:
+            # 转换为RGB (OpenCV默认是BGR)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+            
+            # 查表归一化并转换为CHW布局（像素值必在表内，clip模式免去越界检查的缓冲）
+            np.take(_NORM_LUT, rgb.transpose(2, 0, 1), out=out, mode='clip')
+        
+        return torch.from_numpy(out)
+    
+    def preprocess_batch(self, imgs: List[np.ndarray]) -> torch.Tensor:
+        """
+        预处理多幅图像并一次性拷贝到运行设备
+        
+        参数:
+            imgs: 输入图像列表 (BGR格式，尺寸可以不同)
+            
+        返回:
+            运行设备上的 (N, 3, img_size, img_size) 模型输入张量
+        """
+        if self._preprocess_stream is not None:
+            return self._to_model_input(self._preprocess_batch_gpu(imgs))
+        
+        n = len(imgs)
+        if self._chw_buf.shape[0] < n:
+            self._chw_buf = np.empty((n, 3, self.img_size, self.img_size), dtype=np.float32)
+        
+        # 每幅图像直接写入批次缓冲区中对应的位置，无需再堆叠拷贝
+        for i, img in enumerate(imgs):
+            self.preprocess(img, out=self._chw_buf[i])
+        
+        return self._to_model_input(torch.from_numpy(self._chw_buf[:n]))
+    
+    def _preprocess_batch_gpu(self, imgs: List[np.ndarray]) -> torch.Tensor:
+        """
+        在GPU上预处理多幅图像：只上传原始uint8图像，缩放、通道转换和归一化都在GPU完成
         
-        # 转换为RGB (OpenCV默认是BGR)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        参数:
+            imgs: 输入图像列表 (BGR格式，尺寸可以不同)
+            
+        返回:
+            运行设备上的 (N, 3, img_size, img_size) float32张量
+        """
+        size = self._dsize
+        tensors = []
+        with torch.cuda.stream(self._preprocess_stream):
+            for i, img in enumerate(imgs):
+                # 锁页内存上的异步拷贝不阻塞CPU，可与推理流上的工作重叠
+                t = self._pinned_input(i, img).to(self.device, non_blocking=True)
+                
+                # HWC转NCHW，BGR转RGB
+                t = t.permute(2, 0, 1).unsqueeze(0).float().flip(1)
+                
+                # 双线性缩放并归一化
+                t = F.interpolate(t, size=size, mode='bilinear', align_corners=False)
+                tensors.append(t.mul_(1.0 / 255.0))
+            
+            batch = torch.cat(tensors)
         
-        # 归一化并转换为张量
-        img = img.transpose(2, 0, 1)  # HWC -> CHW
-        img = np.ascontiguousarray(img)
-        img = torch.from_numpy(img).float().div(255.0).unsqueeze(0).to(self.device)
+        # 推理在当前流上执行，需等待预处理完成；并告知缓存分配器该张量会在当前流上使用
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(self._preprocess_stream)
+        batch.record_stream(current_stream)
+        return batch
+    
+    def _pinned_input(self, index: int, img: np.ndarray) -> torch.Tensor:
+        """
+        将图像拷贝到批次位置index对应的锁页内存缓冲区
+        
+        每次检测结束时读取结果会同步推理流，上一次调用的上传已经完成，因此缓冲区可以安全复用
         
-        return img
+        参数:
+            index: 图像在批次中的位置
+            img: 输入图像 (BGR格式)
+            
+        返回:
+            与img内容相同的锁页内存uint8张量
+        """
+        if index == len(self._host_in):
+            self._host_in.append(None)
+        buf = self._host_in[index]
+        if buf is None or tuple(buf.shape) != img.shape:
+            buf = torch.empty(img.shape, dtype=torch.uint8, pin_memory=True)
+            self._host_in[index] = buf
+        np.copyto(buf.numpy(), img)
+        return buf
+    
+    def _stream_context(self):
+        """CUDA上返回推理流上下文，其他设备返回空上下文"""
+        if self._infer_stream is None:
+            return contextlib.nullcontext()
+        return torch.cuda.stream(self._infer_stream)
+    
+    def _to_model_input(self, tensor: torch.Tensor) -> torch.Tensor:
+        """将预处理后的张量移动到运行设备，并匹配模型的数据类型和内存布局"""
+        tensor = tensor.to(self.device, non_blocking=True)
+        if self.use_amp:
+            tensor = tensor.contiguous(memory_format=torch.channels_last).half()
+        return tensor
     
-    def detect(self, img: np.ndarray) -> List[Dict]:
+    def detect(self, img: np.ndarray) -> Detections:
         """
         在图像上进行OBB目标检测
         
@@ -121,91 +501,274 @@ class YOLOv11OBB:
             img: 输入图像 (BGR格式)
             
         返回:
-            检测结果列表，每个结果包含:
-            - box: 旋转框坐标 [cx, cy, w, h, angle]
-            - conf: 置信度
-            - cls_id: 类别ID
-            - cls_name: 类别名称
+            检测结果，包含:
+            - boxes: 旋转框坐标 [cx, cy, w, h, angle]
+            - confs: 置信度
+            - cls_ids: 类别ID
+            可通过as_dicts()转换为字典列表
         """
         try:
             # 保存原始图像尺寸用于后处理
             orig_h, orig_w = img.shape[:2]
             
-            # 预处理图像
-            processed_img = self.preprocess(img)
+            # 预处理、推理和解析都在推理流上执行，只在解析时拷回结果才同步
+            with self._stream_context():
+                # 预处理图像
+                processed_img = self.preprocess_batch([img])
+                
+                # 模型推理，结果一次性拷回主机
+                outputs = self._outputs_to_host(self._forward(processed_img))
+                
+                # 解析结果
+                return self._parse_detections(outputs[0], orig_w, orig_h)
+        except Exception as e:
+            logger.error("检测过程中出错: %s", e)
+            return Detections.empty(self.class_names)
+    
+    def detect_batch(self, imgs: List[np.ndarray]) -> List[Detections]:
+        """
+        对多幅图像进行一次批量推理，将内核启动和Python开销分摊到整个批次
+        
+        参数:
+            imgs: 输入图像列表 (BGR格式，尺寸可以不同)
             
-            # 模型推理
-            with torch.no_grad():
-                results = self.model(processed_img)
+        返回:
+            与输入顺序对应的检测结果列表，每项格式同detect
+        """
+        try:
+            # 保存每幅图像的原始尺寸用于后处理
+            orig_sizes = [img.shape[:2] for img in imgs]
             
-            # 解析结果 (伪代码，根据实际YOLOv11-OBB API调整)
-            detections = []
+            with self._stream_context():
+                # 预处理后堆叠为一个批次，只做一次主机到设备的拷贝
+                batch = self.preprocess_batch(imgs)
+                
+                # 一次前向推理，输出按批次顺序给出每幅图像的检测结果，并一次性拷回主机
+                outputs = self._outputs_to_host(self._forward(batch))
+                return [
+                    self._parse_detections(det, orig_w, orig_h)
+                    for det, (orig_h, orig_w) in zip(outputs, orig_sizes)
+                ]
+        except Exception as e:
+            logger.error("批量检测过程中出错: %s", e)
+            return [Detections.empty(self.class_names) for _ in imgs]
+    
+    def _forward(self, batch: torch.Tensor):
+        """
+        执行模型前向推理
+        
+        参数:
+            batch: 预处理后的输入张量 (N, 3, img_size, img_size)
             
-            # 假设results包含检测到的旋转框、置信度和类别
-            for det in results.obb:  # 假设results有obb属性
-                for *box, conf, cls_id in det:
-                    if conf >= self.conf_threshold:
-                        # 将坐标转换回原始图像尺寸
-                        cx, cy, w, h, angle = box
-                        cx *= orig_w / self.img_size
-                        cy *= orig_h / self.img_size
-                        w *= orig_w / self.img_size
-                        h *= orig_h / self.img_size
-                        
-                        cls_id = int(cls_id)
-                        cls_name = self.class_names[cls_id]
-                        
-                        detections.append({
-                            'box': [cx, cy, w, h, angle],
-                            'conf': float(conf),
-                            'cls_id': cls_id,
-                            'cls_name': cls_name
-                        })
+        返回:
+            每幅图像一项的检测张量，每行为 [cx, cy, w, h, angle, conf, cls_id]
+        """
+        if self.engine is not None:
+            outputs = self.engine.infer(batch)
             
-            return detections
-        except Exception as e:
-            logger.error(f"检测过程中出错: {str(e)}")
-            return []
+            # 引擎内置NMS时直接读取已过滤的结果
+            if 'num_dets' in outputs:
+                return self._decode_efficient_nms(outputs)
+            pred = outputs[self.engine.output_names[0]]
+            if pred.shape[-1] == 7:
+                return self._decode_nms_obb(pred)
+            return self._decode_raw_obb(pred)
+        
+        with torch.inference_mode():
+            pred = self.model(batch)
+        
+        # 推理模式下OBB检测头返回 (解码后的输出, 中间特征)，输出布局与导出模型的原始输出相同
+        if isinstance(pred, (tuple, list)):
+            pred = pred[0]
+        return self._decode_raw_obb(pred)
     
-    def draw_detections(self, img: np.ndarray, detections: List[Dict]) -> np.ndarray:
+    def _decode_raw_obb(self, pred: torch.Tensor) -> List[torch.Tensor]:
+        """
+        解码导出模型的原始OBB输出并执行NMS
+        
+        参数:
+            pred: 原始输出 (N, 4 + 类别数 + 1, 锚点数)，通道依次为cx, cy, w, h、各类别分数和角度
+            
+        返回:
+            每幅图像一项的检测张量，每行为 [cx, cy, w, h, angle, conf, cls_id]
+        """
+        pred = pred.float().transpose(1, 2)  # (N, 锚点数, 通道数)
+        num_images = pred.shape[0]
+        num_classes = pred.shape[2] - 5
+        
+        # 整个批次一次完成置信度过滤，避免逐图像的布尔索引各自同步一次
+        conf, cls_id = pred[..., 4:4 + num_classes].max(dim=2)
+        img_idx, anchor_idx = (conf >= self.conf_threshold).nonzero(as_tuple=True)
+        p = pred[img_idx, anchor_idx]
+        conf, cls_id = conf[img_idx, anchor_idx], cls_id[img_idx, anchor_idx]
+        angle = p[:, 4 + num_classes:4 + num_classes + 1]
+        
+        # 整个批次一次做旋转框NMS：按(图像, 类别)分组平移中心坐标，使不同组的框互不抑制；
+        # 平移量可达数百万，使用float64保证坐标精度
+        boxes = torch.cat([p[:, :4], angle], dim=1).double()
+        group = img_idx * num_classes + cls_id
+        boxes[:, :2] += group[:, None].double() * _NMS_CLASS_OFFSET
+        keep = nms_rotated(boxes, conf, self.iou_threshold)
+        
+        # 按图像拆分；稳定排序保持每幅图像内按置信度降序
+        keep = keep[img_idx[keep].sort(stable=True)[1]]
+        dets = torch.cat([
+            p[keep, :4],
+            angle[keep],
+            conf[keep, None],
+            cls_id[keep, None].float()
+        ], dim=1)
+        counts = torch.bincount(img_idx[keep], minlength=num_images).tolist()
+        return list(dets.split(counts))
+    
+    def _decode_nms_obb(self, pred: torch.Tensor) -> List[torch.Tensor]:
+        """
+        读取内置NMS引擎（Ultralytics以nms=True导出）的输出
+        
+        参数:
+            pred: 输出 (N, 最大检测数, 7)，每行为 [cx, cy, w, h, conf, cls_id, angle]，不足部分以0填充
+            
+        返回:
+            每幅图像一项的检测张量，每行为 [cx, cy, w, h, angle, conf, cls_id]
+        """
+        pred = pred.float()
+        
+        # 整个批次一次去掉填充行，按行优先顺序取出的结果已按图像分组
+        valid = pred[..., 4] > 0
+        counts = valid.sum(dim=1).tolist()
+        dets = pred[valid][:, [0, 1, 2, 3, 6, 4, 5]]
+        return list(dets.split(counts))
+    
+    def _decode_efficient_nms(self, outputs: Dict[str, torch.Tensor]) -> List[torch.Tensor]:
+        """
+        读取EfficientNMS风格插件的输出
+        
+        参数:
+            outputs: 包含num_dets (N, 1)、det_boxes (N, K, 5)、det_scores (N, K)
+                     和det_classes (N, K) 的输出映射，det_boxes每行为 [cx, cy, w, h, angle]
+            
+        返回:
+            每幅图像一项的检测张量，每行为 [cx, cy, w, h, angle, conf, cls_id]
+        """
+        num_dets = outputs['num_dets'].view(-1).tolist()
+        boxes = outputs['det_boxes'].float()
+        scores = outputs['det_scores'].float()
+        classes = outputs['det_classes'].float()
+        return [
+            torch.cat([boxes[i, :n], scores[i, :n, None], classes[i, :n, None]], dim=1)
+            for i, n in enumerate(num_dets)
+        ]
+    
+    def _outputs_to_host(self, outputs):
+        """
+        将整个批次的GPU检测结果通过一次设备到主机拷贝读回
+        
+        参数:
+            outputs: 每幅图像一项的检测张量，每行为 [cx, cy, w, h, angle, conf, cls_id]
+            
+        返回:
+            每幅图像一项的 (n, 7) NumPy数组（指向复用的锁页缓冲区，需在下次调用前使用完毕）；
+            结果不在CUDA上时原样返回
+        """
+        if not outputs or not isinstance(outputs[0], torch.Tensor) or outputs[0].device.type != 'cuda':
+            return outputs
+        
+        counts = [det.shape[0] for det in outputs]
+        dets = torch.cat([det.reshape(-1, 7).float() for det in outputs])
+        total = dets.shape[0]
+        
+        if self._out_host is None or self._out_host.shape[0] < total:
+            rows = max(total, 64 if self._out_host is None else 2 * self._out_host.shape[0])
+            self._out_host = torch.empty((rows, 7), dtype=torch.float32, pin_memory=True)
+        
+        host = self._out_host[:total]
+        host.copy_(dets, non_blocking=True)
+        torch.cuda.current_stream(self.device).synchronize()
+        return np.split(host.numpy(), np.cumsum(counts)[:-1])
+    
+    def _parse_detections(self, det, orig_w: int, orig_h: int) -> Detections:
+        """将单幅图像的模型输出解析为检测结果"""
+        # 一次性转换为连续的 (N, 7) 数组: cx, cy, w, h, angle, conf, cls_id
+        if isinstance(det, torch.Tensor):
+            arr = det.detach().float().cpu().numpy()
+        else:
+            arr = np.asarray(det, dtype=np.float32)
+        arr = arr.reshape(-1, 7)
+        
+        # 按置信度过滤（布尔索引会生成副本，不会修改模型输出）
+        arr = arr[arr[:, 5] >= self.conf_threshold]
+        
+        # 将坐标转换回原始图像尺寸
+        sx = orig_w * self._inv_img_size
+        sy = orig_h * self._inv_img_size
+        arr[:, :4] *= np.array([sx, sy, sx, sy], dtype=arr.dtype)
+        
+        # 直接返回各字段数组，不再逐个构建字典
+        return Detections(
+            boxes=np.ascontiguousarray(arr[:, :5]),
+            confs=np.ascontiguousarray(arr[:, 5]),
+            cls_ids=arr[:, 6].astype(np.int64),
+            class_names=self.class_names
+        )
+    
+    def draw_detections(
+        self,
+        img: np.ndarray,
+        detections: Detections,
+        out: Optional[np.ndarray] = None,
+        inplace: bool = False
+    ) -> np.ndarray:
         """
         在图像上绘制检测结果
         
         参数:
             img: 原始图像
-            detections: 检测结果列表
+            detections: 检测结果
+            out: 可选的预分配输出缓冲区（与img同形状），提供时结果写入其中以复用内存
+            inplace: 是否直接在img上绘制，为True时忽略out且不拷贝图像
             
         返回:
             带有检测结果的图像
         """
-        result_img = img.copy()
+        if inplace:
+            result_img = img
+        elif out is None:
+            result_img = img.copy()
+        else:
+            if out is not img:
+                np.copyto(out, img)
+            result_img = out
         
-        for det in detections:
-            cx, cy, w, h, angle = det['box']
-            conf = det['conf']
-            cls_id = det['cls_id']
-            cls_name = det['cls_name']
+        # 一次计算所有旋转框的整数角点，循环中只做绘制
+        pts = obb_to_corners(detections.boxes)
+        
+        # 批量转换为Python原生数值，循环中不再逐个访问NumPy标量
+        boxes = detections.boxes.tolist()
+        confs = detections.confs.tolist()
+        cls_ids = detections.cls_ids.tolist()
+        colors = self.colors_np[detections.cls_ids].tolist()
+        
+        # 循环不变量提到循环外，避免每个目标重复赋值和属性查找
+        class_names = self.class_names
+        font_scale = 0.6
+        font_thickness = 1
+        
+        for i in range(len(detections)):
+            cx, cy, w, h, _ = boxes[i]
+            conf = confs[i]
+            cls_name = class_names[cls_ids[i]]
             
             # 获取类别对应的颜色
-            color = self.colors[cls_id]
-            
-            # 计算旋转框的四个角点
-            rect = ((cx, cy), (w, h), angle * 180.0 / np.pi)  # OpenCV使用角度制
-            box = cv2.boxPoints(rect)
-            box = np.int0(box)
+            color = colors[i]
             
             # 绘制旋转框
-            cv2.drawContours(result_img, [box], 0, color, 2)
+            cv2.drawContours(result_img, [pts[i]], 0, color, 2)
             
             # 绘制类别名称和置信度
             label = f"{cls_name} {conf:.2f}"
-            font_scale = 0.6
-            font_thickness = 1
             
             # 获取文本大小
-            (text_width, text_height), _ = cv2.getTextSize(
-                label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness
-            )
+            (text_width, text_height), _ = _text_size(label, font_scale, font_thickness)
             
             # 计算文本框位置
             text_offset_x = int(cx - text_width / 2)